@@ -1,175 +1,353 @@
-import streamlit as st
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Arc
-
-# ---------------- Page Config ----------------
-st.set_page_config(page_title="SHM as Projection of UCM", layout="wide")
-
-# ---------------- DARK UI CSS ----------------
-st.markdown(
-    """
-    <style>
-    .stApp { background-color: #0e1117; color: #e6e6e6; }
-    .stSidebar { background-color: #161b22; }
-    h1, h2, h3 { color: white; }
-    label, span, div { color: #e6e6e6 !important; }
-    div[data-testid="stMetric"] {
-        background-color: #161b22;
-        border: 1px solid #30363d;
-        padding: 12px;
-        border-radius: 10px;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-st.title("Harmonic Motion as a Phase Projection of Uniform Circular Motion")
-
-# ---------------- Sidebar ----------------
-st.sidebar.header("Physical Parameters")
-
-A = st.sidebar.slider("Amplitude / Radius (A)", 0.5, 5.0, 2.0, 0.1)
-omega = st.sidebar.slider("Angular Frequency (ω)", 0.1, 5.0, 1.0, 0.1)
-
-phi_map = {"0": 0.0, "π/2": np.pi/2, "π": np.pi, "3π/2": 3*np.pi/2}
-phi = phi_map[st.sidebar.selectbox("Initial Phase (φ)", list(phi_map.keys()))]
-
-t = st.sidebar.slider("Time (t)", 0.0, 10.0, 0.01)
-
-freeze = st.sidebar.button("📌 Freeze State")
-reset = st.sidebar.button("♻ Reset All")
-
-# ---------------- Session State ----------------
-if "frozen" not in st.session_state:
-    st.session_state.frozen = []
-
-if reset:
-    st.session_state.frozen = []
-
-# ---------------- Physics ----------------
-theta = omega * t + phi
-x = A * np.cos(theta)
-y = A * np.sin(theta)
-
-# ---------------- Solved Values ----------------
-st.subheader("🔢 Solved Values")
-
-c1, c2, c3 = st.columns(3)
-c1.metric("θ(t) (rad)", f"{theta:.4f}")
-c2.metric("x(t)", f"{x:.4f}")
-c3.metric("y(t)", f"{y:.4f}")
-
-# ---------------- Freeze Handling ----------------
-color_cycle = plt.cm.tab10.colors
-if freeze:
-    idx = len(st.session_state.frozen)
-    scale = max(1 - 0.08 * idx, 0.45)
-    color = color_cycle[idx % len(color_cycle)]
-    st.session_state.frozen.append(
-        (omega, phi, A, t, theta, scale, color)
-    )
-
-# ---------------- Figure ----------------
-fig, (ax_c, ax_s) = plt.subplots(
-    1, 2, figsize=(14, 6),
-    gridspec_kw={"width_ratios": [1, 2]}
-)
-
-fig.patch.set_facecolor("white")
-ax_c.set_facecolor("white")
-ax_s.set_facecolor("white")
-
-# Force black axes text
-for ax in [ax_c, ax_s]:
-    ax.tick_params(colors="black")
-    ax.xaxis.label.set_color("black")
-    ax.yaxis.label.set_color("black")
-    ax.title.set_color("black")
-    for spine in ax.spines.values():
-        spine.set_color("black")
-        spine.set_linewidth(1.2)
-
-# ================== UCM PHASOR ==================
-circle = plt.Circle((0, 0), A, fill=False, linestyle="--", linewidth=2, color="black")
-ax_c.add_artist(circle)
-
-ax_c.axhline(0, color="black")
-ax_c.axvline(0, color="black")
-
-# Frozen phasors
-for ωf, φf, Af, _, θf, sc, col in st.session_state.frozen:
-    ax_c.arrow(
-        0, 0,
-        Af * sc * np.cos(θf),
-        Af * sc * np.sin(θf),
-        color=col,
-        alpha=0.7,
-        head_width=0.05 * A,
-        length_includes_head=True
-    )
-
-# Live phasor
-ax_c.arrow(
-    0, 0, x, y,
-    color="red",
-    head_width=0.08 * A,
-    length_includes_head=True
-)
-
-# Projections
-ax_c.plot([x, x], [0, y], ":", color="gray")
-ax_c.plot([0, x], [0, 0], ":", color="gray")
-
-# Angle arc
-arc = Arc((0, 0), 0.6*A, 0.6*A,
-          theta1=0, theta2=np.degrees(theta),
-          linewidth=1.5, color="black")
-ax_c.add_patch(arc)
-
-ax_c.text(
-    0.35*A*np.cos(theta/2),
-    0.35*A*np.sin(theta/2),
-    r"$\theta=\omega t+\phi$",
-    color="black"
-)
-
-ax_c.set_aspect("equal")
-ax_c.set_xlim(-A-0.5, A+0.5)
-ax_c.set_ylim(-A-0.5, A+0.5)
-ax_c.set_xlabel("x")
-ax_c.set_ylabel("y")
-ax_c.set_title("Uniform Circular Motion (Phasor)")
-ax_c.grid(color="gray", alpha=0.3)
-
-# ================== SHM (FROZEN ONLY) ==================
-t_vals = np.linspace(0, 10, 1000)
-
-# Frozen SHM waves ONLY
-for ωf, φf, Af, _, _, sc, col in st.session_state.frozen:
-    ax_s.plot(
-        t_vals,
-        Af * sc * np.sin(ωf * t_vals + φf),
-        color=col,
-        linewidth=2.0,
-        alpha=0.9
-    )
-
-# Live moving point ONLY
-ax_s.plot(t, y, "ro", markersize=7)
-
-ax_s.set_xlim(0, 10)
-ax_s.set_ylim(-A - 0.5, A + 0.5)
-ax_s.set_xlabel("Time (t)")
-ax_s.set_ylabel("Displacement y(t)")
-ax_s.set_title("Simple Harmonic Motion (Frozen States)")
-ax_s.grid(color="gray", alpha=0.3)
-
-st.pyplot(fig)
-
-# ---------------- Mathematics ----------------
-with st.expander(" Mathematical Description", expanded=True):
-    st.latex(r"\theta(t) = \omega t + \phi")
-    st.latex(rf"\theta(t) = {omega:.2f}({t:.2f}) + {phi:.2f} = {theta:.4f}")
-    st.latex(rf"y(t) = {A:.2f}\sin(\omega t + \phi) = {y:.4f}")
+import io
+import math
+
+import streamlit as st
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.patches import Arc
+
+# Tab10 palette resolved once at import — the freeze handler no longer
+# goes through the colormap registry on every rerun.
+COLOR_CYCLE = plt.cm.tab10.colors
+
+# Initial-phase choices, built once instead of re-allocating the dict
+# (and its labels) on every rerun.
+PHI_MAP = {"0": 0.0, "π/2": math.pi/2, "π": math.pi, "3π/2": 3*math.pi/2}
+
+# Unit circle tessellated once at import; per-amplitude circles are just
+# scaled copies, so a fresh A costs one multiply instead of 200 cos/sin.
+UNIT_CIRCLE = np.column_stack([
+    np.cos(np.linspace(0.0, 2.0 * np.pi, 200)),
+    np.sin(np.linspace(0.0, 2.0 * np.pi, 200)),
+])
+
+# Pin mathtext to a bundled font up front so axis labels like θ=ωt+φ
+# never trigger computer-modern font lookups at draw time.
+plt.rcParams.update({"mathtext.fontset": "dejavusans", "text.usetex": False})
+
+# Let Agg drop collinear vertices aggressively — the wave is smooth and
+# oversampled relative to its on-screen width — and chunk long paths so
+# they stream through the rasterizer instead of building one huge path.
+plt.rcParams["path.simplify"] = True
+plt.rcParams["path.simplify_threshold"] = 1.0
+plt.rcParams["agg.path.chunksize"] = 10000
+
+# No automatic layout passes; the fixed two-panel geometry never needs them.
+plt.rcParams["figure.autolayout"] = False
+
+# ---------------- Page Config ----------------
+st.set_page_config(page_title="SHM as Projection of UCM", layout="wide")
+
+# ---------------- DARK UI CSS ----------------
+st.markdown(
+    """
+    <style>
+    .stApp { background-color: #0e1117; color: #e6e6e6; }
+    .stSidebar { background-color: #161b22; }
+    h1, h2, h3 { color: white; }
+    label, span, div { color: #e6e6e6 !important; }
+    div[data-testid="stMetric"] {
+        background-color: #161b22;
+        border: 1px solid #30363d;
+        padding: 12px;
+        border-radius: 10px;
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+)
+
+# ---------------- Cached Helpers ----------------
+@st.cache_resource
+def warm_font_cache():
+    """One throwaway mathtext draw per process so the first real render
+    does not pay matplotlib's font discovery."""
+    fig, ax = plt.subplots()
+    ax.text(0, 0, r"$\theta$")
+    fig.canvas.draw()
+    plt.close(fig)
+    return True
+
+
+warm_font_cache()
+
+
+def compute_state(A, omega, phi, t):
+    """Scalar kinematic state at time t: phase angle and phasor tip (x, y).
+
+    math.sin/cos beat the numpy ufuncs by ~10x on scalar arguments.
+    """
+    theta = omega * t + phi
+    return theta, A * math.cos(theta), A * math.sin(theta)
+
+
+def empty_frozen():
+    """Fresh frozen-state store: parallel arrays (SoA), one per field,
+    so the plot path consumes contiguous columns with no tuple unpacking."""
+    return {
+        "omega": np.empty(0),
+        "phi": np.empty(0),
+        "amp": np.empty(0),    # A * scale, the only way amplitude is consumed
+        "xf": np.empty(0),     # phasor tip frozen at freeze time
+        "yf": np.empty(0),
+        "colors": [],
+    }
+
+
+def wave_samples(omega):
+    """Samples needed for a visually smooth curve at angular frequency ω.
+
+    Level-of-detail: ~100 samples per rad/s on top of a 200-sample floor,
+    capped at the original 1000 — slow waves render with a fraction of
+    the vertices while fast ones keep plenty per cycle.
+    """
+    return int(min(1000.0, max(200.0, 100.0 * omega + 200.0)))
+
+
+@st.cache_data(max_entries=64)
+def circle_xy(A):
+    """Reference circle of radius A scaled from the pre-tessellated unit
+    circle, cached per amplitude."""
+    pts = A * UNIT_CIRCLE
+    return pts[:, 0], pts[:, 1]
+
+
+@st.cache_data
+def time_grid(n=1000):
+    """Static time axis for the SHM panel — built once per (n), reused across reruns."""
+    t = np.linspace(0.0, 10.0, n, dtype=np.float32)
+    # st.cache_data hands every cache hit a fresh unpickled (writeable)
+    # copy, so this flag only guards the one return that bypasses the
+    # cache — the miss below. Callers must not rely on the grid being
+    # shared or immutable.
+    t.setflags(write=False)
+    return t
+
+
+@st.cache_data(max_entries=64)
+def compute_waves(params, n=1000):
+    """All frozen waves A·sin(ωt + φ) as one (N, T) array via a single broadcast sin.
+
+    `params` is a tuple of (omega, phi, amplitude) tuples so the result
+    is memoized on the exact frozen set.
+    """
+    # float32 columns keep the whole broadcast in single precision to
+    # match the float32 grid — plenty for plot coordinates.
+    omegas, phis, amps = (
+        np.asarray(v, dtype=np.float32)[:, None] for v in zip(*params)
+    )
+    # Built in place on one output buffer instead of chaining three temporaries.
+    Y = omegas * time_grid(n)
+    Y += phis
+    np.sin(Y, out=Y)
+    Y *= amps
+    return Y
+
+
+def build_scene(scene, A, F):
+    """(Re)draw everything that does not depend on t.
+
+    Called only when the amplitude or the frozen set changes: styles both
+    axes, lays down the reference circle and the frozen overlays, and
+    creates the dynamic artists (projections, arc, label, dot) that the
+    per-rerun path then mutates in place.
+    """
+    if "fig" not in scene:
+        # dpi 90 instead of the default 100 — the embed is narrower than
+        # 1400px anyway, so this only trims PNG encode time and payload.
+        scene["fig"], (scene["ax_c"], scene["ax_s"]) = plt.subplots(
+            1, 2, figsize=(14, 6), dpi=90,
+            gridspec_kw={"width_ratios": [1, 2]}
+        )
+    fig, ax_c, ax_s = scene["fig"], scene["ax_c"], scene["ax_s"]
+    ax_c.cla()
+    ax_s.cla()
+
+    fig.patch.set_facecolor("white")
+    ax_c.set_facecolor("white")
+    ax_s.set_facecolor("white")
+
+    # Force black axes text
+    for ax in [ax_c, ax_s]:
+        ax.tick_params(colors="black")
+        ax.xaxis.label.set_color("black")
+        ax.yaxis.label.set_color("black")
+        ax.title.set_color("black")
+        for spine in ax.spines.values():
+            spine.set_color("black")
+            spine.set_linewidth(1.2)
+
+    # ================== UCM PHASOR ==================
+    cx, cy = circle_xy(A)
+    ax_c.plot(cx, cy, linestyle="--", linewidth=2, color="black")
+
+    ax_c.axhline(0, color="black")
+    ax_c.axvline(0, color="black")
+
+    # Frozen phasors — one quiver call on the endpoints stored at freeze time
+    if F["omega"].size:
+        zeros = np.zeros(F["omega"].size)
+        ax_c.quiver(
+            zeros, zeros, F["xf"], F["yf"],
+            color=F["colors"],
+            alpha=0.7,
+            angles="xy", scale_units="xy", scale=1,
+            width=0.008
+        )
+
+    ax_c.set_aspect("equal")
+    ax_c.set_xlim(-A-0.5, A+0.5)
+    ax_c.set_ylim(-A-0.5, A+0.5)
+    ax_c.set_xlabel("x")
+    ax_c.set_ylabel("y")
+    ax_c.set_title("Uniform Circular Motion (Phasor)")
+    ax_c.grid(color="gray", alpha=0.3)
+
+    # ================== SHM (FROZEN ONLY) ==================
+    # Frozen SHM waves ONLY — one broadcast sin, one LineCollection artist
+    if F["omega"].size:
+        wave_params = tuple(zip(F["omega"], F["phi"], F["amp"]))
+        n = wave_samples(F["omega"].max())
+        t_vals = time_grid(n)
+        Y = compute_waves(wave_params, n)
+        segs = np.stack([np.broadcast_to(t_vals, Y.shape), Y], axis=-1)
+        ax_s.add_collection(
+            LineCollection(segs, colors=F["colors"], linewidths=2.0, alpha=0.9)
+        )
+
+    ax_s.set_xlim(0, 10)
+    ax_s.set_ylim(-A - 0.5, A + 0.5)
+    ax_s.set_xlabel("Time (t)")
+    ax_s.set_ylabel("Displacement y(t)")
+    ax_s.set_title("Simple Harmonic Motion (Frozen States)")
+    ax_s.grid(color="gray", alpha=0.3)
+
+    # Dynamic artists — created empty here, positioned on every rerun
+    scene["phasor"] = ax_c.quiver(
+        [0.0], [0.0], [0.0], [0.0],
+        color="red",
+        angles="xy", scale_units="xy", scale=1,
+        width=0.012
+    )
+    scene["proj"] = LineCollection([], linestyles=":", colors="gray")
+    ax_c.add_collection(scene["proj"])
+    scene["arc"] = Arc((0, 0), 0.6*A, 0.6*A,
+                       theta1=0, theta2=0,
+                       linewidth=1.5, color="black")
+    ax_c.add_patch(scene["arc"])
+    scene["label"] = ax_c.text(0, 0, r"$\theta=\omega t+\phi$", color="black")
+    scene["dot"] = ax_s.scatter([0.0], [0.0], c="red", s=49, zorder=3)
+
+
+st.title("Harmonic Motion as a Phase Projection of Uniform Circular Motion")
+
+# ---------------- Sidebar ----------------
+st.sidebar.header("Physical Parameters")
+
+A = st.sidebar.slider("Amplitude / Radius (A)", 0.5, 5.0, 2.0, 0.1)
+omega = st.sidebar.slider("Angular Frequency (ω)", 0.1, 5.0, 1.0, 0.1)
+
+phi = PHI_MAP[st.sidebar.selectbox("Initial Phase (φ)", list(PHI_MAP.keys()))]
+
+t = st.sidebar.slider("Time (t)", 0.0, 10.0, 0.01)
+
+# ---------------- Session State ----------------
+if "frozen" not in st.session_state:
+    st.session_state.frozen = empty_frozen()
+
+# Bumped whenever the frozen set changes, so the render path knows when
+# the static scaffolding has to be rebuilt.
+if "frozen_version" not in st.session_state:
+    st.session_state.frozen_version = 0
+
+# The scene dict carries the per-session Figure plus the artist handles
+# that reruns mutate in place instead of rebuilding the plot.
+if "scene" not in st.session_state:
+    st.session_state.scene = {}
+
+
+# ---------------- Interactive Panel ----------------
+# Scoped to a fragment so Freeze/Reset clicks rerun only this function,
+# skipping the page chrome (CSS, title, sidebar widget tree). The buttons
+# sit inside the fragment because Streamlit does not allow fragment
+# widgets in externally-created containers like the sidebar.
+@st.fragment
+def render_motion(A, omega, phi, t):
+    bcol1, bcol2, _ = st.columns([1, 1, 4])
+    freeze = bcol1.button("📌 Freeze State")
+    reset = bcol2.button("♻ Reset All")
+
+    if reset:
+        st.session_state.frozen = empty_frozen()
+        st.session_state.frozen_version += 1
+
+    # ---------------- Physics ----------------
+    theta, x, y = compute_state(A, omega, phi, t)
+
+    # ---------------- Solved Values ----------------
+    st.subheader("🔢 Solved Values")
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("θ(t) (rad)", f"{theta:.4f}")
+    c2.metric("x(t)", f"{x:.4f}")
+    c3.metric("y(t)", f"{y:.4f}")
+
+    # ---------------- Freeze Handling ----------------
+    F = st.session_state.frozen
+    if freeze:
+        idx = F["omega"].size
+        scale = max(1 - 0.08 * idx, 0.45)
+        # The phasor tip (scale*x, scale*y) is frozen alongside the
+        # parameters — replaying it later costs no trig at all.
+        for key, val in (("omega", omega), ("phi", phi), ("amp", A * scale),
+                         ("xf", scale * x), ("yf", scale * y)):
+            F[key] = np.append(F[key], val)
+        F["colors"].append(COLOR_CYCLE[idx % len(COLOR_CYCLE)])
+        st.session_state.frozen_version += 1
+
+    # ---------------- Figure ----------------
+    # Static scaffolding is rebuilt only when A or the frozen set changes;
+    # scrubbing the time slider just repositions the dynamic artists. If
+    # the full state matches the previous rerun (a click that changed
+    # nothing), even that is skipped and the cached PNG is re-served.
+    scene = st.session_state.scene
+    static_key = (A, st.session_state.frozen_version)
+    frame_key = (A, omega, phi, t, st.session_state.frozen_version)
+    if scene.get("frame_key") != frame_key:
+        if scene.get("key") != static_key:
+            build_scene(scene, A, F)
+            scene["key"] = static_key
+
+        # Live phasor — persistent quiver, tip moved in place
+        scene["phasor"].set_UVC([x], [y])
+
+        # Projections — both dotted guides in one collection
+        scene["proj"].set_segments([[(x, 0), (x, y)], [(0, 0), (x, 0)]])
+
+        # Angle arc and label
+        scene["arc"].theta2 = math.degrees(theta)
+        h = 0.5 * theta
+        r = 0.35 * A
+        scene["label"].set_position((r * math.cos(h), r * math.sin(h)))
+
+        # Live moving point ONLY — one offsets copy into the persistent scatter
+        scene["dot"].set_offsets([[t, y]])
+
+        buf = io.BytesIO()
+        scene["fig"].savefig(buf, format="png")
+        scene["png"] = buf.getvalue()
+        scene["frame_key"] = frame_key
+
+    st.image(scene["png"], width="stretch")
+
+    # ---------------- Mathematics ----------------
+    with st.expander(" Mathematical Description", expanded=True):
+        st.latex(r"\theta(t) = \omega t + \phi")
+        st.latex(rf"\theta(t) = {omega:.2f}({t:.2f}) + {phi:.2f} = {theta:.4f}")
+        st.latex(rf"y(t) = {A:.2f}\sin(\omega t + \phi) = {y:.4f}")
+
+
+render_motion(A, omega, phi, t)